@@ -2,35 +2,127 @@ import os
 import re
 import sys
 import json
+import asyncio
+import hashlib
 import argparse
+import collections
 import concurrent.futures
-import pandas as pd
-import pytesseract
-from PIL import Image
-from pdf2image import convert_from_path
-
-# Try importing OpenAI and Google Gen AI
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-
-try:
-    import anthropic
-except ImportError:
-    anthropic = None
+
+# OCR, Excel and LLM provider libraries are imported where they are used, so that
+# save_excel / ocr_only runs and argument errors don't pay for loading all of them
 
 # Ensure Tesseract is in the path or configured
 # pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
 
-def extract_text_from_file(file_path):
+# Bump when OCR settings or the extraction prompt change, to invalidate --cache-dir entries
+OCR_VERSION = "3"
+PROMPT_VERSION = "2"
+
+# Batch API jobs are polled every 30s, backing off to at most every 5 minutes
+BATCH_POLL_INTERVAL = 30
+BATCH_POLL_MAX_INTERVAL = 300
+# Consecutive failed status checks before a batch job is given up on
+BATCH_POLL_MAX_ERRORS = 10
+
+# Follow-up attempts when the LLM returns malformed or incomplete JSON
+MAX_JSON_RETRIES = 2
+
+# File types picked up when scanning a directory
+EXTS = {'.pdf', '.png', '.jpg', '.jpeg'}
+
+# Filenames containing any of these are notices, receipts, etc. rather than certificates
+SKIP_KEYWORDS = ('通知书', '收据', '合同', '检测报告', '受理', '清单', '说明书')
+# One alternation finds any of them in a single scan of the name
+SKIP_PATTERN = re.compile('|'.join(map(re.escape, SKIP_KEYWORDS)))
+
+# Characters not allowed in output filenames
+SANITIZE = re.compile(r'[\\/*?:"<>|]')
+
+# Keys every extraction result must carry
+REQUIRED_KEYS = ("专利号", "专利名称", "专利权人", "专利类型", "发明人", "申请日")
+
+# The prompt only gets the OCR text around the first of these markers
+CERTIFICATE_KEYWORDS = ('专利号', 'ZL', '证书号')
+EXCERPT_BEFORE = 200
+EXCERPT_AFTER = 2000
+# Used when no marker is found (e.g. foreign certificates)
+EXCERPT_FALLBACK = 4000
+# Born-digital PDFs with more embedded text than this skip OCR entirely
+MIN_NATIVE_TEXT_CHARS = 200
+WHITESPACE_RUN = re.compile(r'[ \t]+')
+NEWLINE_RUN = re.compile(r' ?\n\s*')
+
+# Keep in sync with default_page_threads in patent-certificate-extractor/scripts/extract_ocr.py
+def default_page_threads(workers=1):
+    """
+    Threads for page-level OCR when `workers` processes share the CPU.
+    Each Tesseract run already uses ~4 cores, so split cores/4 between them.
+    """
+    return max(1, (os.cpu_count() or 1) // (4 * max(1, workers)))
+
+def default_ocr_workers():
+    """OCR processes for the LLM pipelines: Tesseract scales roughly linearly up to cores/4 runs."""
+    return max(1, (os.cpu_count() or 1) // 4)
+
+# Keep in sync with binarize_image in patent-certificate-extractor/scripts/extract_ocr.py
+# (this script is run standalone and does not import the skill's scripts)
+def binarize_image(image):
+    """
+    Converts a page image to 1-bit black and white using Otsu's threshold, so
+    Tesseract skips its own binarization pass over a 24-bit image.
+    """
+    gray = image.convert('L')
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    threshold = 0
+    best_variance = 0.0
+    weight_bg = 0
+    weighted_bg = 0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        weighted_bg += level * count
+        mean_bg = weighted_bg / weight_bg
+        mean_fg = (weighted_total - weighted_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            threshold = level
+
+    return gray.point(lambda value: 255 if value > threshold else 0, mode='1')
+
+def native_pdf_text(file_path, max_pages=3):
+    """Embedded text layer of the first `max_pages` pages; empty or near-empty for scanned PDFs."""
+    import pymupdf
+    with pymupdf.open(file_path) as doc:
+        return "\n".join(doc.load_page(i).get_text() for i in range(min(max_pages, doc.page_count)))
+
+def render_pdf_pages(file_path, max_pages=3, dpi=200):
+    """Yields the first `max_pages` pages of a PDF as RGB images, rendering each only when requested."""
+    import pymupdf
+    from PIL import Image
+    with pymupdf.open(file_path) as doc:
+        for page_index in range(min(max_pages, doc.page_count)):
+            pixmap = doc.load_page(page_index).get_pixmap(dpi=dpi)
+            yield Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+            del pixmap
+
+def ocr_page(image, page_num):
+    import pytesseract
+    print(f"  OCR Page {page_num}...")
+    return pytesseract.image_to_string(binarize_image(image), lang='chi_sim+eng')
+
+def extract_text_from_file(file_path, threads=None):
     """
     Extracts text from a PDF or Image file using OCR.
+    PDF pages are streamed and OCRed concurrently on up to `threads` threads,
+    so at most about `threads` rendered pages are in memory at once.
     """
     text = ""
     file_ext = os.path.splitext(file_path)[1].lower()
@@ -38,17 +130,32 @@ def extract_text_from_file(file_path):
     try:
         if file_ext == '.pdf':
             print(f"Processing PDF: {file_path}")
-            # Convert PDF to images
+            native = native_pdf_text(file_path)
+            if len(native.strip()) > MIN_NATIVE_TEXT_CHARS:
+                print("  Using embedded text layer, skipping OCR")
+                return native
+
             # Only process the first 3 pages to save time/resources, usually info is on page 1
-            images = convert_from_path(file_path, first_page=1, last_page=3)
-            for i, image in enumerate(images):
-                print(f"  OCR Page {i+1}...")
-                page_text = pytesseract.image_to_string(image, lang='chi_sim+eng')
-                text += page_text + "\n"
+            pages = render_pdf_pages(file_path)
+            max_threads = threads or default_page_threads()
+            if max_threads <= 1:
+                texts = [ocr_page(image, i) for i, image in enumerate(pages, 1)]
+            else:
+                texts = []
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
+                    in_flight = collections.deque()
+                    for i, image in enumerate(pages, 1):
+                        if len(in_flight) >= max_threads:
+                            texts.append(in_flight.popleft().result())
+                        in_flight.append(executor.submit(ocr_page, image, i))
+                    texts.extend(future.result() for future in in_flight)
+            text = "".join(page_text + "\n" for page_text in texts)
         elif file_ext in ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.webp']:
             print(f"Processing Image: {file_path}")
+            import pytesseract
+            from PIL import Image
             image = Image.open(file_path)
-            text = pytesseract.image_to_string(image, lang='chi_sim+eng')
+            text = pytesseract.image_to_string(binarize_image(image), lang='chi_sim+eng')
         else:
             print(f"Unsupported file format: {file_ext}")
             return None
@@ -58,6 +165,77 @@ def extract_text_from_file(file_path):
         
     return text
 
+def _sha256_hex(*parts):
+    """SHA-256 over length-prefixed parts, so ('ab', 'c') and ('a', 'bc') never collide."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+def _write_cache_file(path, content):
+    """Write-through to the cache; the rename keeps concurrent readers from seeing partial files."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def extract_text_cached(file_path, threads=None, cache_dir=None):
+    """
+    extract_text_from_file memoized under cache_dir/ocr, keyed by the file's bytes.
+    """
+    if not cache_dir:
+        return extract_text_from_file(file_path, threads)
+
+    with open(file_path, 'rb') as f:
+        key = _sha256_hex(OCR_VERSION, f.read())
+    cache_path = os.path.join(cache_dir, 'ocr', f"{key}.txt")
+    if os.path.exists(cache_path):
+        print(f"OCR cache hit: {file_path}")
+        with open(cache_path, encoding='utf-8') as f:
+            return f.read()
+
+    text = extract_text_from_file(file_path, threads)
+    if text:
+        _write_cache_file(cache_path, text)
+    return text
+
+def llm_cache_path(cache_dir, provider, model, text):
+    """Cache location for one document's extraction, keyed by provider, model, prompt version and OCR text."""
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'llm', f"{_sha256_hex(provider, model, PROMPT_VERSION, text_hash)}.json")
+
+def load_cached_extraction(cache_path):
+    """Returns the cached extraction, or None if missing, unreadable or lacking a required key."""
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or any(key not in data for key in REQUIRED_KEYS):
+        return None
+    return data
+
+def compact_text(text):
+    """Collapses runs of spaces/tabs and blank lines, which make up much of raw OCR output."""
+    text = WHITESPACE_RUN.sub(' ', text)
+    return NEWLINE_RUN.sub('\n', text).strip()
+
+def certificate_excerpt(text):
+    """
+    Returns the compacted OCR text around the first certificate marker (专利号 / ZL / 证书号),
+    which is where the fields the LLM needs are. Falls back to the start of the text.
+    """
+    text = compact_text(text)
+    positions = [pos for pos in (text.find(keyword) for keyword in CERTIFICATE_KEYWORDS) if pos >= 0]
+    if not positions:
+        return text[:EXCERPT_FALLBACK]
+    idx = min(positions)
+    return text[max(0, idx - EXCERPT_BEFORE):idx + EXCERPT_AFTER]
+
 def get_extraction_prompt(text):
     return f"""
     You are a professional patent analyst. Extract the following information from the provided OCR text of a Patent Certificate.
@@ -75,35 +253,184 @@ def get_extraction_prompt(text):
     If a field is not found, set it to null.
 
     OCR Text:
-    {text[:8000]} 
+    {certificate_excerpt(text)} 
     """
 
-def extract_with_gemini(text, api_key, model_name="gemini-1.5-flash"):
+def get_batch_extraction_prompt(texts):
+    """
+    Builds one prompt covering several certificates (one numbered DOC section each),
+    so a whole batch costs a single LLM round-trip.
+    """
+    docs = "".join(f"--- DOC {i} ---\n{certificate_excerpt(text)}\n" for i, text in enumerate(texts, 1))
+    return f"""
+    You are a professional patent analyst. Extract the following information from each of the {len(texts)} Patent Certificate OCR texts below.
+    The text may contain OCR errors, please correct them based on context.
+    
+    Required Fields:
+    - Patent Number (专利号): Format usually starts with ZL...
+    - Patent Name (专利名称): Title of the patent.
+    - Patent Holder (专利权人): The owner/applicant.
+    - Patent Type (专利类型): e.g., 发明, 实用新型, 外观设计.
+    - Inventor (发明人): List of inventors.
+    - Application Date (申请日): Format YYYY-MM-DD.
+
+    Return ONLY a valid JSON object of the form {{"results": [...]}}, where "results" is a JSON array of objects, one per DOC, in order ({len(texts)} objects in total).
+    Each object has these keys: "专利号", "专利名称", "专利权人", "专利类型", "发明人", "申请日".
+    If a field is not found, set it to null.
+
+    OCR Texts:
+    {docs}
+    """
+
+def strip_code_fence(content):
+    """Removes a markdown code block wrapper around a JSON response, if any."""
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    return content.strip()
+
+def parse_batch_response(content, expected):
+    """
+    Parses a batched extraction response into a list of `expected` dicts (or None per
+    entry that is not an object with every required key, so the caller can retry it on
+    its own). Accepts either {"results": [...]} or a bare JSON array.
+    Returns None if the response does not contain exactly one entry per document.
+    """
+    parsed = json.loads(strip_code_fence(content))
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results", next((v for v in parsed.values() if isinstance(v, list)), None))
+    if not isinstance(parsed, list) or len(parsed) != expected:
+        found = len(parsed) if isinstance(parsed, list) else 0
+        print(f"  Batch response has {found} entries, expected {expected}.")
+        return None
+    return [item if extraction_error(item) is None else None for item in parsed]
+
+def extraction_error(data):
+    """Returns why `data` is not a usable extraction (not an object, missing keys), or None if it is."""
+    if not isinstance(data, dict):
+        return "expected a JSON object"
+    missing = [key for key in REQUIRED_KEYS if key not in data]
+    if missing:
+        return f"missing keys {', '.join(missing)}"
+    return None
+
+def check_extraction(content):
+    """
+    Parses one document's reply. Returns (data, None) if it is a JSON object with every
+    required key, else (None, error) where error is fed back to the model on retry.
+    """
+    try:
+        data = json.loads(strip_code_fence(content))
+    except json.JSONDecodeError as e:
+        return None, f"invalid JSON ({e})"
+    error = extraction_error(data)
+    if error:
+        return None, error
+    return data, None
+
+def retry_feedback(error):
+    return f"Your JSON was invalid: {error}. Return ONLY valid JSON with the keys {', '.join(REQUIRED_KEYS)}."
+
+async def extract_with_gemini(text, client, model_name="gemini-1.5-flash"):
+    # `client` is the genai.GenerativeModel for model_name, created once in main()
     print("  Invoking Gemini for extraction...")
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
-        prompt = get_extraction_prompt(text)
-        
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        
-        # Clean up response text if it contains markdown code blocks
-        content = response.text
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.endswith("```"):
-            content = content[:-3]
-            
-        return json.loads(content)
+        contents = [{"role": "user", "parts": [get_extraction_prompt(text)]}]
+        for attempt in range(MAX_JSON_RETRIES + 1):
+            response = await client.generate_content_async(contents, generation_config={"response_mime_type": "application/json"})
+            content = response.text
+            data, error = check_extraction(content)
+            if data is not None:
+                return data
+            if attempt < MAX_JSON_RETRIES:
+                print(f"  Gemini returned {error}, retrying...")
+                contents = contents + [
+                    {"role": "model", "parts": [content]},
+                    {"role": "user", "parts": [retry_feedback(error)]}
+                ]
+                await asyncio.sleep(attempt + 1)
+        print(f"  Gemini Extraction failed: {error}")
+        return None
     except Exception as e:
         print(f"  Gemini Extraction failed: {e}")
         return None
 
-def extract_with_openai(text, client, model="gpt-3.5-turbo"):
+async def extract_with_openai(text, client, model="gpt-3.5-turbo"):
     print("  Invoking OpenAI-compatible LLM for extraction...")
-    prompt = get_extraction_prompt(text)
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant that extracts JSON data from text."},
+        {"role": "user", "content": get_extraction_prompt(text)}
+    ]
     try:
-        response = client.chat.completions.create(
+        for attempt in range(MAX_JSON_RETRIES + 1):
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            content = response.choices[0].message.content
+            data, error = check_extraction(content)
+            if data is not None:
+                return data
+            if attempt < MAX_JSON_RETRIES:
+                print(f"  LLM returned {error}, retrying...")
+                messages = messages + [
+                    {"role": "assistant", "content": content},
+                    {"role": "user", "content": retry_feedback(error)}
+                ]
+                await asyncio.sleep(attempt + 1)
+        print(f"  LLM Extraction failed: {error}")
+        return None
+    except Exception as e:
+        print(f"  LLM Extraction failed: {e}")
+        return None
+
+async def extract_with_claude(text, client, model="claude-3-5-sonnet-20241022"):
+    print("  Invoking Claude for extraction...")
+    messages = [{"role": "user", "content": get_extraction_prompt(text)}]
+    try:
+        for attempt in range(MAX_JSON_RETRIES + 1):
+            response = await client.messages.create(
+                model=model,
+                max_tokens=1024,
+                system="You are a helpful assistant that extracts JSON data from text. Output ONLY valid JSON.",
+                messages=messages
+            )
+            content = response.content[0].text
+            data, error = check_extraction(content)
+            if data is not None:
+                return data
+            if attempt < MAX_JSON_RETRIES:
+                print(f"  Claude returned {error}, retrying...")
+                messages = messages + [
+                    {"role": "assistant", "content": content},
+                    {"role": "user", "content": retry_feedback(error)}
+                ]
+                await asyncio.sleep(attempt + 1)
+        print(f"  Claude Extraction failed: {error}")
+        return None
+    except Exception as e:
+        print(f"  Claude Extraction failed: {e}")
+        return None
+
+async def extract_batch_with_gemini(texts, client, model_name="gemini-1.5-flash"):
+    print(f"  Invoking Gemini for extraction of {len(texts)} documents...")
+    try:
+        prompt = get_batch_extraction_prompt(texts)
+        
+        response = await client.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
+        return parse_batch_response(response.text, len(texts))
+    except Exception as e:
+        print(f"  Gemini Extraction failed: {e}")
+        return None
+
+async def extract_batch_with_openai(texts, client, model="gpt-3.5-turbo"):
+    print(f"  Invoking OpenAI-compatible LLM for extraction of {len(texts)} documents...")
+    prompt = get_batch_extraction_prompt(texts)
+    try:
+        response = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that extracts JSON data from text."},
@@ -112,38 +439,296 @@ def extract_with_openai(text, client, model="gpt-3.5-turbo"):
             temperature=0.1,
             response_format={"type": "json_object"}
         )
-        content = response.choices[0].message.content
-        return json.loads(content)
+        return parse_batch_response(response.choices[0].message.content, len(texts))
     except Exception as e:
         print(f"  LLM Extraction failed: {e}")
         return None
 
-def extract_with_claude(text, api_key, model="claude-3-5-sonnet-20241022"):
-    print("  Invoking Claude for extraction...")
-    prompt = get_extraction_prompt(text)
+async def extract_batch_with_claude(texts, client, model="claude-3-5-sonnet-20241022"):
+    print(f"  Invoking Claude for extraction of {len(texts)} documents...")
+    prompt = get_batch_extraction_prompt(texts)
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-        response = client.messages.create(
+        response = await client.messages.create(
             model=model,
-            max_tokens=1024,
+            max_tokens=min(1024 * len(texts), 8192),
             system="You are a helpful assistant that extracts JSON data from text. Output ONLY valid JSON.",
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
-        content = response.content[0].text
-        
-        # Simple cleanup if Claude wraps in markdown (though system prompt helps)
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-            
-        return json.loads(content)
+        return parse_batch_response(response.content[0].text, len(texts))
     except Exception as e:
         print(f"  Claude Extraction failed: {e}")
         return None
 
+class AsyncRateLimiter:
+    """
+    Spaces out request starts so that at most `rate` requests begin per `period` seconds.
+    """
+    def __init__(self, rate, period=60.0):
+        self.interval = period / rate
+        self._next_start = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+async def ocr_files(ocr_pool, files, threads, cache_dir=None):
+    """OCRs `files` on `ocr_pool`; returns (file_path, text) for files that produced text, in order."""
+    loop = asyncio.get_running_loop()
+    texts = await asyncio.gather(*[
+        loop.run_in_executor(ocr_pool, extract_text_cached, file_path, threads, cache_dir)
+        for file_path in files
+    ], return_exceptions=True)
+    docs = []
+    for file_path, text in zip(files, texts):
+        if isinstance(text, Exception):
+            print(f"  OCR failed for {os.path.basename(file_path)}: {text}")
+        elif text:
+            docs.append((file_path, text))
+    return docs
+
+def split_cached_extractions(docs, provider, model, cache_dir=None):
+    """
+    Looks up each (file_path, text) in the LLM cache.
+    Returns (extracted, pending): cached results keyed by file path, and
+    (file_path, text, cache_path) for the documents that still need an LLM call.
+    """
+    extracted = {}
+    pending = []
+    for file_path, text in docs:
+        cache_path = llm_cache_path(cache_dir, provider, model, text) if cache_dir else None
+        cached = load_cached_extraction(cache_path) if cache_path else None
+        if cached is not None:
+            print(f"  LLM cache hit: {os.path.basename(file_path)}")
+            extracted[file_path] = cached
+        else:
+            pending.append((file_path, text, cache_path))
+    return extracted, pending
+
+def store_extractions(pending, data_list, extracted):
+    """
+    Records LLM results for `pending` documents in `extracted` and writes complete ones
+    through to the cache (incomplete results would be rejected on load and re-queried anyway).
+    """
+    for (file_path, _, cache_path), data in zip(pending, data_list):
+        extracted[file_path] = data
+        if cache_path and extraction_error(data) is None:
+            _write_cache_file(cache_path, json.dumps(data, ensure_ascii=False))
+
+async def run_full_extraction(files, provider, client, model, batch_size=8, max_concurrency=4, rpm=None,
+                              cache_dir=None):
+    """
+    OCRs `files` in a process pool and extracts patent info with concurrent LLM calls.
+    At most `max_concurrency` requests are in flight and at most `rpm` start per minute.
+    Every file is queued for OCR up front; OCR results are drained in order and each batch
+    is sent to the LLM as soon as it is full, so OCR of later files overlaps LLM round-trips.
+    With `cache_dir`, OCR text and extraction results are reused across runs.
+    Returns a list of (file_path, data) in input order; data is None on failure.
+    """
+    extract_single = {"gemini": extract_with_gemini, "claude": extract_with_claude, "openai": extract_with_openai}[provider]
+    extract_batch = {"gemini": extract_batch_with_gemini, "claude": extract_batch_with_claude, "openai": extract_batch_with_openai}[provider]
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    limiter = AsyncRateLimiter(rpm) if rpm else None
+
+    async def call_llm(extract, payload):
+        async with semaphore:
+            if limiter:
+                await limiter.wait()
+            return await extract(payload, client, model)
+
+    async def process_batch(docs):
+        extracted, pending = split_cached_extractions(docs, provider, model, cache_dir)
+        if pending:
+            batch_texts = [text for _, text, _ in pending]
+            batch_data = None
+            if len(batch_texts) > 1:
+                batch_data = await call_llm(extract_batch, batch_texts)
+                if batch_data is None:
+                    print("  Batch extraction failed, retrying documents one by one.")
+            if batch_data is None:
+                batch_data = await asyncio.gather(*[call_llm(extract_single, text) for text in batch_texts])
+            else:
+                # Entries the batch reply got wrong go through the single-document path and its retries
+                retry = [i for i, data in enumerate(batch_data) if data is None]
+                if retry:
+                    print(f"  {len(retry)} batch entries were incomplete, retrying them one by one.")
+                    retried = await asyncio.gather(*[call_llm(extract_single, batch_texts[i]) for i in retry])
+                    for i, data in zip(retry, retried):
+                        batch_data[i] = data
+            store_extractions(pending, batch_data, extracted)
+        return [(fp, extracted[fp]) for fp, _ in docs]
+
+    workers = default_ocr_workers()
+    threads = default_page_threads(workers)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ocr_pool:
+        # Producer: every file is queued for OCR immediately
+        ocr_queue = collections.deque(
+            (file_path, asyncio.wrap_future(ocr_pool.submit(extract_text_cached, file_path, threads, cache_dir)))
+            for file_path in files
+        )
+
+        # Consumer: drain OCR results in order and hand each full batch to the LLM without waiting on it
+        llm_tasks = []
+        docs = []
+        while ocr_queue:
+            file_path, future = ocr_queue.popleft()
+            try:
+                text = await future
+            except Exception as e:
+                print(f"  OCR failed for {os.path.basename(file_path)}: {e}")
+                text = None
+            if text:
+                docs.append((file_path, text))
+            if len(docs) == batch_size or (docs and not ocr_queue):
+                llm_tasks.append(asyncio.create_task(process_batch(docs)))
+                docs = []
+        outcomes = await asyncio.gather(*llm_tasks)
+
+    return [item for outcome in outcomes for item in outcome]
+
+async def wait_for_batch_job(fetch, is_done, describe):
+    """
+    Polls a provider batch job with exponential backoff (BATCH_POLL_INTERVAL doubling up to
+    BATCH_POLL_MAX_INTERVAL) until is_done(job) is true; returns the final job object.
+    A failed status check (e.g. a network hiccup) is retried on the same schedule; after
+    BATCH_POLL_MAX_ERRORS failures in a row the last error is raised.
+    """
+    interval = BATCH_POLL_INTERVAL
+    errors = 0
+    while True:
+        try:
+            job = await fetch()
+            errors = 0
+        except Exception as e:
+            errors += 1
+            if errors >= BATCH_POLL_MAX_ERRORS:
+                raise
+            print(f"  Batch status check failed ({e}); checking again in {interval}s...")
+        else:
+            if is_done(job):
+                return job
+            print(f"  {describe(job)}; checking again in {interval}s...")
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, BATCH_POLL_MAX_INTERVAL)
+
+async def run_openai_batch(texts, client, model):
+    """
+    Extracts every text through the OpenAI Batch API (one chat completion request per document).
+    Returns a list of extraction dicts in input order; None where a request failed.
+    """
+    lines = []
+    for i, text in enumerate(texts):
+        lines.append(json.dumps({
+            "custom_id": f"doc-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": "You are a helpful assistant that extracts JSON data from text."},
+                    {"role": "user", "content": get_extraction_prompt(text)}
+                ],
+                "temperature": 0.1,
+                "response_format": {"type": "json_object"}
+            }
+        }, ensure_ascii=False))
+
+    results = [None] * len(texts)
+    try:
+        input_file = await client.files.create(file=("requests.jsonl", "\n".join(lines).encode('utf-8')), purpose="batch")
+        batch = await client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        print(f"  Submitted OpenAI batch {batch.id} with {len(texts)} requests.")
+
+        batch = await wait_for_batch_job(
+            lambda: client.batches.retrieve(batch.id),
+            lambda job: job.status in ("completed", "failed", "expired", "cancelled"),
+            lambda job: f"OpenAI batch {job.id} is {job.status}",
+        )
+
+        if not batch.output_file_id:
+            print(f"  OpenAI batch {batch.id} ended with status {batch.status} and no output.")
+            return results
+
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            idx = int(item["custom_id"].split("-", 1)[1])
+            results[idx] = check_extraction(response["body"]["choices"][0]["message"]["content"])[0]
+    except Exception as e:
+        print(f"  OpenAI Batch API extraction failed: {e}")
+    return results
+
+async def run_claude_batch(texts, client, model):
+    """
+    Extracts every text through the Anthropic Message Batches API (one request per document).
+    Returns a list of extraction dicts in input order; None where a request failed.
+    """
+    requests = [
+        {
+            "custom_id": f"doc-{i}",
+            "params": {
+                "model": model,
+                "max_tokens": 1024,
+                "system": "You are a helpful assistant that extracts JSON data from text. Output ONLY valid JSON.",
+                "messages": [{"role": "user", "content": get_extraction_prompt(text)}]
+            }
+        }
+        for i, text in enumerate(texts)
+    ]
+    results = [None] * len(texts)
+    try:
+        batch = await client.messages.batches.create(requests=requests)
+        print(f"  Submitted Claude batch {batch.id} with {len(texts)} requests.")
+
+        await wait_for_batch_job(
+            lambda: client.messages.batches.retrieve(batch.id),
+            lambda job: job.processing_status == "ended",
+            lambda job: f"Claude batch {job.id} is {job.processing_status}",
+        )
+
+        async for entry in await client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                continue
+            idx = int(entry.custom_id.split("-", 1)[1])
+            results[idx] = check_extraction(entry.result.message.content[0].text)[0]
+    except Exception as e:
+        print(f"  Claude Batch API extraction failed: {e}")
+    return results
+
+async def run_batch_api_extraction(files, provider, client, model, cache_dir=None):
+    """
+    OCRs `files`, then submits every uncached document as a single provider Batch API job
+    (OpenAI or Claude). Slower to return than live calls but about half the price and not
+    subject to the live rate limits. Returns a list of (file_path, data) in input order.
+    """
+    submit = {"openai": run_openai_batch, "claude": run_claude_batch}[provider]
+
+    workers = default_ocr_workers()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ocr_pool:
+        docs = await ocr_files(ocr_pool, files, default_page_threads(workers), cache_dir)
+
+    extracted, pending = split_cached_extractions(docs, provider, model, cache_dir)
+    if pending:
+        data_list = await submit([text for _, text, _ in pending], client, model)
+        store_extractions(pending, data_list, extracted)
+    return [(fp, extracted[fp]) for fp, _ in docs]
+
+def excel_cell_value(value):
+    """Returns value as xlsxwriter can write it; lists/dicts (e.g. inventor lists) are written as text."""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
 def save_results_to_excel(results, output_dir=None):
     """
     Saves the list of dictionaries (results) to an Excel file.
@@ -162,12 +747,7 @@ def save_results_to_excel(results, output_dir=None):
     if not output_dir:
         output_dir = os.getcwd()
 
-    df = pd.DataFrame(results)
     cols = ['序号', '专利号', '专利名称', '专利权人', '专利类型', '发明人', '申请日', '文件路径']
-    for col in cols:
-        if col not in df.columns:
-            df[col] = None
-    df = df[cols]
     
     # Determine output filename based on one of the patent holders
     holder_name = "专利信息汇总"
@@ -175,14 +755,23 @@ def save_results_to_excel(results, output_dir=None):
         name = res.get('专利权人')
         if name and isinstance(name, str) and name.strip() and name.lower() != 'none':
             # Sanitize filename
-            holder_name = re.sub(r'[\\/*?:"<>|]', '', name.strip())
+            holder_name = SANITIZE.sub('', name.strip())
             break
     
     output_filename = f"{holder_name}-专利信息.xlsx"
     output_path = os.path.join(output_dir, output_filename)
     
     print(f"Saving results to {output_path}...")
-    df.to_excel(output_path, index=False)
+    # One Excel table (header, filters, banded rows) written in a single call
+    import xlsxwriter
+    rows = [[excel_cell_value(res.get(col)) for col in cols] for res in results]
+    workbook = xlsxwriter.Workbook(output_path)
+    worksheet = workbook.add_worksheet()
+    worksheet.add_table(0, 0, len(rows), len(cols) - 1, {
+        'columns': [{'header': col} for col in cols],
+        'data': rows,
+    })
+    workbook.close()
     print("Done.")
     
     try:
@@ -195,16 +784,41 @@ def save_results_to_excel(results, output_dir=None):
     except Exception:
         pass
 
+def scan_files(path, skip_pattern=None):
+    """
+    Recursively yields supported files under path. Uses os.scandir so directory entries
+    are not stat'ed twice, and drops skipped names before they are ever opened.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"Warning: cannot read directory {path}: {e}")
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from scan_files(entry.path, skip_pattern)
+        elif os.path.splitext(entry.name)[1].lower() in EXTS:
+            if skip_pattern and skip_pattern.search(entry.name):
+                print(f"Skipping non-certificate file: {entry.name}")
+                continue
+            yield entry.path
+
 def main():
     parser = argparse.ArgumentParser(description="Extract patent info using OCR and optional LLM.")
     parser.add_argument("path", help="Path to file or directory", nargs='?')
     parser.add_argument("--api-key", help="API Key", default=None)
     parser.add_argument("--base-url", help="Base URL (for OpenAI compatible)", default=os.environ.get("OPENAI_BASE_URL"))
     parser.add_argument("--model", help="Model name", default=None)
-    parser.add_argument("--provider", help="Provider: 'gemini', 'openai', or 'regex'", default="auto")
+    parser.add_argument("--provider", help="Provider: 'gemini', 'claude', 'openai', or 'auto' (picked from the API key environment variables)", default="auto")
     parser.add_argument("--action", choices=['full', 'ocr_only', 'save_excel'], default='full', help="Action mode")
     parser.add_argument("--data", help="JSON string data for save_excel action")
     parser.add_argument("--output-dir", help="Explicit output directory")
+    parser.add_argument("--llm-batch-size", type=int, default=8, help="Certificates sent to the LLM per request (1 disables batching; 4-16 works well)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Maximum LLM requests in flight at once")
+    parser.add_argument("--rpm", type=float, default=None, help="Maximum LLM requests started per minute (default: unlimited)")
+    parser.add_argument("--cache-dir", help="Directory for reusing OCR text and LLM results across runs (default: no cache)")
+    parser.add_argument("--batch-api", action="store_true", help="Use the OpenAI/Claude Batch API (cheaper, results may take minutes to hours)")
     
     args = parser.parse_args()
 
@@ -238,15 +852,17 @@ def main():
         sys.exit(1)
 
     input_path = args.path
+    # Non-certificate files are only worth skipping when they would be sent to the LLM
+    skip_pattern = SKIP_PATTERN if args.action == 'full' else None
     files_to_process = []
     
     if os.path.isfile(input_path):
-        files_to_process.append(input_path)
+        if skip_pattern and skip_pattern.search(os.path.basename(input_path)):
+            print(f"Skipping non-certificate file: {os.path.basename(input_path)}")
+        else:
+            files_to_process.append(input_path)
     elif os.path.isdir(input_path):
-        for root, dirs, files in os.walk(input_path):
-            for file in files:
-                if file.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg')):
-                    files_to_process.append(os.path.join(root, file))
+        files_to_process = list(scan_files(input_path, skip_pattern))
     
     if not files_to_process:
         print("No valid files found.")
@@ -256,9 +872,11 @@ def main():
     if args.action == 'ocr_only':
         print(f"Found {len(files_to_process)} files to process.")
         
-        # Use ProcessPoolExecutor to parallelize OCR
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            future_to_file = {executor.submit(extract_text_from_file, fp): fp for fp in files_to_process}
+        # Use ProcessPoolExecutor to parallelize OCR; page threads share what is left
+        workers = os.cpu_count() or 1
+        threads = default_page_threads(workers)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            future_to_file = {executor.submit(extract_text_cached, fp, threads, args.cache_dir): fp for fp in files_to_process}
             
             for future in concurrent.futures.as_completed(future_to_file):
                 file_path = future_to_file[future]
@@ -313,7 +931,9 @@ def main():
 
         if not model:
             model = "gemini-1.5-flash"
-        if not genai:
+        try:
+            import google.generativeai as genai
+        except ImportError:
             print("Error: google-generativeai library not installed. Please install it with `pip install google-generativeai`.")
             sys.exit(1)
 
@@ -325,7 +945,9 @@ def main():
             sys.exit(1)
         if not model:
             model = "claude-3-5-sonnet-20241022"
-        if not anthropic:
+        try:
+            import anthropic
+        except ImportError:
             print("Error: anthropic library not installed. Please install it with `pip install anthropic`.")
             sys.exit(1)
             
@@ -337,49 +959,57 @@ def main():
             sys.exit(1)
         if not model:
             model = "gpt-3.5-turbo"
-        if not OpenAI:
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
             print("Error: openai library not installed.")
             sys.exit(1)
 
+    if provider not in ("gemini", "claude", "openai"):
+        print(f"Error: unsupported provider '{provider}'. Use 'gemini', 'claude' or 'openai'.")
+        sys.exit(1)
+
+    if args.batch_api and provider not in ("openai", "claude"):
+        print("Error: --batch-api is only supported for the 'openai' and 'claude' providers.")
+        sys.exit(1)
+
     print(f"Extraction Mode: {provider.upper()}")
-    if provider != "regex":
-        print(f"Model: {model}")
-    
-    # Define keywords for non-certificate files to skip
-    skip_keywords = ['通知书', '收据', '合同', '检测报告', '受理', '清单', '说明书']
+    print(f"Model: {model}")
     
     results = []
     
-    # Initialize Clients
-    openai_client = None
+    # Initialize clients once so every request reuses the same connection pool
+    client = None
     if provider == "openai":
-        openai_client = OpenAI(api_key=api_key, base_url=args.base_url)
+        client = AsyncOpenAI(api_key=api_key, base_url=args.base_url)
+    elif provider == "claude":
+        client = anthropic.AsyncAnthropic(api_key=api_key)
+    elif provider == "gemini":
+        genai.configure(api_key=api_key)
+        client = genai.GenerativeModel(model)
+
+    if args.batch_api:
+        extracted = asyncio.run(run_batch_api_extraction(
+            files_to_process, provider, client, model, cache_dir=args.cache_dir,
+        ))
+    else:
+        # Several certificates share one LLM round-trip; batches are dispatched concurrently
+        extracted = asyncio.run(run_full_extraction(
+            files_to_process, provider, client, model,
+            batch_size=max(1, args.llm_batch_size),
+            max_concurrency=args.max_concurrency,
+            rpm=args.rpm,
+            cache_dir=args.cache_dir,
+        ))
+
+    for file_path, data in extracted:
+        # STRICT MODE: No Regex Fallback
+        if data:
+            data['文件路径'] = file_path
+            results.append(data)
+        else:
+            print(f"  Warning: LLM extraction failed for {os.path.basename(file_path)}. Skipping.")
 
-    for file_path in files_to_process:
-        filename = os.path.basename(file_path)
-        
-        # Check if file should be skipped
-        if any(keyword in filename for keyword in skip_keywords):
-            print(f"Skipping non-certificate file: {filename}")
-            continue
-            
-        text = extract_text_from_file(file_path)
-        if text:
-            data = None
-            if provider == "gemini":
-                data = extract_with_gemini(text, api_key, model)
-            elif provider == "claude":
-                data = extract_with_claude(text, api_key, model)
-            elif provider == "openai":
-                data = extract_with_openai(text, openai_client, model)
-            
-            # STRICT MODE: No Regex Fallback
-            if data:
-                data['文件路径'] = file_path
-                results.append(data)
-            else:
-                print(f"  Warning: LLM extraction failed for {filename}. Skipping.")
-            
     save_results_to_excel(results, target_output_dir)
 
 if __name__ == "__main__":
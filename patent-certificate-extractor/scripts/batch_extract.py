@@ -8,22 +8,27 @@ Supports both sequential and concurrent processing for improved performance.
 
 import sys
 import json
-import subprocess
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing
 import time
 
+from extract_ocr import create_tesseract_api, default_page_threads, extract_text
 
-def extract_text_from_file(file_path: Path, ocr_script_path: Path) -> str:
-    """Extract OCR text from a single file"""
-    result = subprocess.run(
-        ['python3', str(ocr_script_path), str(file_path)],
-        capture_output=True,
-        text=True
-    )
-    return result.stdout
+# Per-worker Tesseract API handle, opened once by _init_worker (None without tesserocr)
+_API = None
+
+
+def _init_worker():
+    """ProcessPoolExecutor initializer: load the Tesseract language data once per worker"""
+    global _API
+    _API = create_tesseract_api()
+
+
+def extract_text_from_file(file_path: Path, api: Optional[Any] = None, threads: Optional[int] = None) -> str:
+    """Extract OCR text from a single file in-process"""
+    return extract_text(file_path, api=api, threads=threads)
 
 
 def save_extracted_text(file_path: Path, text: str):
@@ -37,17 +42,21 @@ def process_single_file(args: tuple) -> Optional[Dict[str, Any]]:
     """
     Process a single PDF file (wrapper for concurrent execution)
 
+    Reuses the worker's Tesseract API handle when tesserocr is available,
+    otherwise falls back to pytesseract with page-level threads.
+
     Args:
-        args: Tuple of (pdf_file, ocr_script_path, file_index, total_files)
+        args: Tuple of (pdf_file, file_index, total_files, threads_per_worker)
 
     Returns:
-        Dictionary with extracted data or None if failed
+        Dictionary with the saved text file path or None if failed. The OCR text
+        itself is not returned, so it is not pickled back to the parent process.
     """
-    pdf_file, ocr_script_path, idx, total = args
+    pdf_file, idx, total, threads = args
 
     try:
         # Extract OCR text
-        text = extract_text_from_file(pdf_file, ocr_script_path)
+        text = extract_text_from_file(pdf_file, _API, threads)
 
         if text:
             # Save extracted text for manual review
@@ -57,7 +66,6 @@ def process_single_file(args: tuple) -> Optional[Dict[str, Any]]:
             return {
                 'filename': pdf_file.name,
                 'file_path': str(pdf_file),
-                'extracted_text': text,
                 'extracted_text_file': str(saved_file)
             }
         else:
@@ -69,13 +77,16 @@ def process_single_file(args: tuple) -> Optional[Dict[str, Any]]:
         return None
 
 
-def batch_process_sequential(folder_path: Path, ocr_script_path: Path) -> List[Dict[str, Any]]:
+def batch_process_sequential(folder_path: Path, threads: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Process all PDF files in a folder sequentially (original implementation)
 
+    A single Tesseract API handle is opened up front and reused for every
+    file when tesserocr is available.
+
     Args:
         folder_path: Path to folder containing PDF files
-        ocr_script_path: Path to OCR extraction script
+        threads: Page-level OCR threads when no API handle is available
 
     Returns:
         List of dictionaries with extracted data
@@ -87,38 +98,44 @@ def batch_process_sequential(folder_path: Path, ocr_script_path: Path) -> List[D
     print("Processing mode: Sequential")
     print("=" * 80)
 
-    for idx, pdf_file in enumerate(pdf_files, 1):
-        print(f"\n[{idx}/{len(pdf_files)}] Processing: {pdf_file.name}")
-
-        # Extract OCR text
-        text = extract_text_from_file(pdf_file, ocr_script_path)
-
-        if text:
-            # Save extracted text for manual review
-            saved_file = save_extracted_text(pdf_file, text)
-            print(f"  ✓ Extracted text saved to: {saved_file.name}")
-
-            # Store for LLM processing
-            results.append({
-                'filename': pdf_file.name,
-                'file_path': str(pdf_file),
-                'extracted_text': text,
-                'extracted_text_file': str(saved_file)
-            })
-        else:
-            print(f"  ✗ Failed to extract text")
+    api = create_tesseract_api()
+    try:
+        for idx, pdf_file in enumerate(pdf_files, 1):
+            print(f"\n[{idx}/{len(pdf_files)}] Processing: {pdf_file.name}")
+
+            # Extract OCR text
+            text = extract_text_from_file(pdf_file, api, threads)
+
+            if text:
+                # Save extracted text for manual review
+                saved_file = save_extracted_text(pdf_file, text)
+                print(f"  ✓ Extracted text saved to: {saved_file.name}")
+
+                # The text itself stays on disk; consumers read extracted_text_file
+                results.append({
+                    'filename': pdf_file.name,
+                    'file_path': str(pdf_file),
+                    'extracted_text_file': str(saved_file)
+                })
+            else:
+                print(f"  ✗ Failed to extract text")
+    finally:
+        if api is not None:
+            api.End()
 
     return results
 
 
-def batch_process_concurrent(folder_path: Path, ocr_script_path: Path, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+def batch_process_concurrent(folder_path: Path, max_workers: Optional[int] = None,
+                             threads_per_worker: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Process all PDF files in a folder concurrently using multiprocessing
 
     Args:
         folder_path: Path to folder containing PDF files
-        ocr_script_path: Path to OCR extraction script
         max_workers: Maximum number of worker processes (default: CPU count)
+        threads_per_worker: Page-level OCR threads per worker
+            (default: CPU cores / 4 divided between the workers)
 
     Returns:
         List of dictionaries with extracted data
@@ -130,20 +147,24 @@ def batch_process_concurrent(folder_path: Path, ocr_script_path: Path, max_worke
     if max_workers is None:
         max_workers = min(multiprocessing.cpu_count(), len(pdf_files))
 
+    # Avoid oversubscribing cores with nested page-level threads
+    if threads_per_worker is None:
+        threads_per_worker = default_page_threads(max_workers)
+
     print(f"Found {len(pdf_files)} PDF files to process")
-    print(f"Processing mode: Concurrent (workers={max_workers})")
+    print(f"Processing mode: Concurrent (workers={max_workers}, threads per worker={threads_per_worker})")
     print("=" * 80)
     print()
 
     # Prepare arguments for each file
     task_args = [
-        (pdf_file, ocr_script_path, idx, len(pdf_files))
+        (pdf_file, idx, len(pdf_files), threads_per_worker)
         for idx, pdf_file in enumerate(pdf_files, 1)
     ]
 
     # Process files concurrently
     completed_count = 0
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
         # Submit all tasks
         future_to_file = {
             executor.submit(process_single_file, args): args[0]
@@ -169,21 +190,14 @@ def batch_process_concurrent(folder_path: Path, ocr_script_path: Path, max_worke
 
 def save_batch_results(results: List[Dict[str, Any]], output_file: Path):
     """Save batch processing results to JSON"""
-    # Remove extracted_text to avoid huge files
-    results_copy = []
-    for result in results:
-        result_copy = result.copy()
-        result_copy.pop('extracted_text', None)
-        results_copy.append(result_copy)
-
-    output_file.write_text(json.dumps(results_copy, ensure_ascii=False, indent=2), encoding='utf-8')
+    output_file.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
     print(f"\n✓ Batch results saved to: {output_file}")
 
 
 def main():
     """Main entry point"""
     if len(sys.argv) < 2:
-        print("Usage: python batch_extract.py <folder_path> [output_json] [--concurrent] [--workers=N]")
+        print("Usage: python batch_extract.py <folder_path> [output_json] [--concurrent] [--workers=N] [--threads=N]")
         print("\nExamples:")
         print("  python batch_extract.py ./patents")
         print("  python batch_extract.py ./patents --concurrent")
@@ -191,6 +205,7 @@ def main():
         print("\nOptions:")
         print("  --concurrent    Enable concurrent processing (default: sequential)")
         print("  --workers=N     Set number of worker processes (default: CPU count)")
+        print("  --threads=N     Set page-level OCR threads per worker (default: CPU cores / 4 / workers)")
         sys.exit(1)
 
     # Parse arguments
@@ -200,6 +215,7 @@ def main():
     use_concurrent = '--concurrent' in sys.argv
     output_json = None
     max_workers = None
+    threads_per_worker = None
 
     for arg in sys.argv[2:]:
         if arg.startswith('--workers='):
@@ -207,6 +223,11 @@ def main():
                 max_workers = int(arg.split('=')[1])
             except ValueError:
                 print(f"Warning: Invalid workers value '{arg}', using default")
+        elif arg.startswith('--threads='):
+            try:
+                threads_per_worker = int(arg.split('=')[1])
+            except ValueError:
+                print(f"Warning: Invalid threads value '{arg}', using default")
         elif not arg.startswith('--'):
             output_json = arg
 
@@ -214,22 +235,14 @@ def main():
         print(f"Error: Folder not found: {folder_path}")
         sys.exit(1)
 
-    # Path to OCR script
-    script_dir = Path(__file__).parent
-    ocr_script = script_dir / 'extract_ocr.py'
-
-    if not ocr_script.exists():
-        print(f"Error: OCR script not found: {ocr_script}")
-        sys.exit(1)
-
     # Start timing
     start_time = time.time()
 
     # Process files
     if use_concurrent:
-        results = batch_process_concurrent(folder_path, ocr_script, max_workers)
+        results = batch_process_concurrent(folder_path, max_workers, threads_per_worker)
     else:
-        results = batch_process_sequential(folder_path, ocr_script)
+        results = batch_process_sequential(folder_path, threads_per_worker)
 
     # Calculate elapsed time
     elapsed_time = time.time() - start_time
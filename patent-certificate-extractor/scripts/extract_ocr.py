@@ -6,15 +6,36 @@ Extracts text from PDF and image files using Tesseract OCR.
 Supports Chinese and English text extraction.
 """
 
+import os
 import sys
 import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List
-import tempfile
+from typing import Any, Iterable, List, Optional
 
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
 
+# Certificate details are on the first pages; later pages are annexes
+MAX_PDF_PAGES = 3
+
+# 200 DPI is enough for certificate-sized print; 300 DPI is only used when
+# the first pass yields too little text to be a real OCR result
+PDF_DPI = 200
+PDF_FALLBACK_DPI = 300
+MIN_PDF_TEXT_CHARS = 100
+
+# Born-digital PDFs with more embedded text than this are read directly, without OCR
+MIN_NATIVE_TEXT_CHARS = 200
+
+
+@lru_cache(maxsize=None)
 def check_tesseract_installed():
-    """Check if Tesseract OCR is installed"""
+    """Check if Tesseract OCR is installed (probed once per process)"""
     try:
         result = subprocess.run(['tesseract', '--version'], capture_output=True, text=True)
         return result.returncode == 0
@@ -22,90 +43,278 @@ def check_tesseract_installed():
         return False
 
 
-def extract_from_image(image_path: Path, lang: str = 'chi_sim+eng') -> str:
+# Keep in sync with default_page_threads in the top-level extractor.py
+def default_page_threads(workers: int = 1) -> int:
+    """
+    Number of threads to use for page-level OCR inside one process
+
+    A single Tesseract run already keeps about four cores busy, so the CPU is
+    split into cores/4 slots shared between `workers` OCR processes.
+
+    Args:
+        workers: Number of processes OCRing concurrently
+
+    Returns:
+        Thread count (at least 1)
+    """
+    return max(1, (os.cpu_count() or 1) // (4 * max(1, workers)))
+
+
+def tesseract_available(api: Optional[Any] = None) -> bool:
+    """Check Tesseract can run, printing install hints if not (a tesserocr handle embeds its own engine)"""
+    if api is not None or check_tesseract_installed():
+        return True
+    print("Tesseract OCR is not installed or not in PATH", file=sys.stderr)
+    print("Install it from: https://github.com/tesseract-ocr/tesseract", file=sys.stderr)
+    return False
+
+
+def create_tesseract_api(lang: str = 'chi_sim+eng') -> Optional[Any]:
+    """
+    Open a reusable in-process Tesseract API handle
+
+    Loading the language data is the expensive part of Tesseract start-up, so
+    callers that OCR many files should open one handle and pass it to
+    extract_text(). Call api.End() when finished.
+
+    Args:
+        lang: Language code (default: chi_sim+eng for Chinese and English)
+
+    Returns:
+        tesserocr.PyTessBaseAPI instance, or None if tesserocr is not installed
+        or cannot load the language data (callers then fall back to pytesseract)
+    """
+    try:
+        from tesserocr import PyTessBaseAPI
+    except ImportError:
+        return None
+    try:
+        return PyTessBaseAPI(lang=lang)
+    except RuntimeError as e:
+        print(f"Could not initialize tesserocr ({e}); falling back to pytesseract", file=sys.stderr)
+        return None
+
+
+# Keep in sync with binarize_image in the top-level extractor.py, which has its own copy
+def binarize_image(image):
+    """
+    Convert a page image to 1-bit black and white using Otsu's threshold
+
+    Certificates are dark print on a near-uniform background, so a global
+    threshold is enough and spares Tesseract its own binarization pass over
+    a 24-bit image.
+
+    Args:
+        image: PIL Image in any mode
+
+    Returns:
+        PIL Image in mode '1'
+    """
+    gray = image.convert('L')
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    threshold = 0
+    best_variance = 0.0
+    weight_bg = 0
+    weighted_bg = 0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        weighted_bg += level * count
+        mean_bg = weighted_bg / weight_bg
+        mean_fg = (weighted_total - weighted_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            threshold = level
+
+    return gray.point(lambda value: 255 if value > threshold else 0, mode='1')
+
+
+def ocr_image(image, lang: str = 'chi_sim+eng', api: Optional[Any] = None) -> str:
+    """
+    Run Tesseract on an in-memory PIL image
+
+    Args:
+        image: PIL Image to recognise
+        lang: Language code (ignored when api is given; the handle fixes it)
+        api: Optional tesserocr.PyTessBaseAPI handle to reuse
+
+    Returns:
+        Extracted text as string
+    """
+    image = binarize_image(image)
+    if api is not None:
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    if pytesseract is None:
+        raise RuntimeError("pytesseract not installed. Install with: pip install pytesseract")
+    return pytesseract.image_to_string(image, lang=lang)
+
+
+def extract_from_image(image_path: Path, lang: str = 'chi_sim+eng', api: Optional[Any] = None) -> str:
     """
     Extract text from an image file using Tesseract OCR
     
     Args:
         image_path: Path to the image file
         lang: Language code (default: chi_sim+eng for Chinese and English)
+        api: Optional tesserocr.PyTessBaseAPI handle to reuse
     
     Returns:
         Extracted text as string
     """
     try:
-        # Use Tesseract to extract text to stdout
-        result = subprocess.run(
-            ['tesseract', str(image_path), 'stdout', '-l', lang],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error extracting text from {image_path}: {e}", file=sys.stderr)
-        return ""
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            return ocr_image(image, lang, api)
     except Exception as e:
-        print(f"Unexpected error processing {image_path}: {e}", file=sys.stderr)
+        print(f"Error extracting text from {image_path}: {e}", file=sys.stderr)
         return ""
 
 
-def extract_from_pdf(pdf_path: Path, lang: str = 'chi_sim+eng') -> str:
+def render_pdf_page(page, dpi: int):
+    """
+    Render a PyMuPDF page to a PIL image in-process
+
+    Args:
+        page: pymupdf.Page to render
+        dpi: Rendering resolution
+
+    Returns:
+        RGB PIL Image
+    """
+    from PIL import Image
+
+    pixmap = page.get_pixmap(dpi=dpi)
+    return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def ocr_images(images: Iterable[Any], lang: str = 'chi_sim+eng', api: Optional[Any] = None,
+               threads: Optional[int] = None) -> List[str]:
+    """
+    OCR several page images, returning their texts in page order
+
+    `images` may be a lazy iterable (e.g. pages rendered on demand); only
+    about `threads` pages are held in memory at once. A shared api handle is
+    not thread-safe, so pages run sequentially when one is given.
+
+    Args:
+        images: PIL Images to recognise
+        lang: Language code (default: chi_sim+eng for Chinese and English)
+        api: Optional tesserocr.PyTessBaseAPI handle to reuse
+        threads: Maximum OCR threads (default: default_page_threads())
+
+    Returns:
+        List of extracted texts, one per image
+    """
+    max_threads = threads or default_page_threads()
+    if api is not None or max_threads <= 1:
+        return [ocr_image(image, lang, api) for image in images]
+
+    texts = []
+    with ThreadPoolExecutor(max_workers=max_threads) as executor:
+        in_flight = deque()
+        for image in images:
+            if len(in_flight) >= max_threads:
+                texts.append(in_flight.popleft().result())
+            in_flight.append(executor.submit(ocr_image, image, lang))
+        texts.extend(future.result() for future in in_flight)
+    return texts
+
+
+def ocr_pages(pages: List[Any], lang: str = 'chi_sim+eng', api: Optional[Any] = None,
+              threads: Optional[int] = None) -> List[str]:
+    """
+    OCR PyMuPDF pages at PDF_DPI, retrying at PDF_FALLBACK_DPI if too little text comes back
+
+    Args:
+        pages: pymupdf.Page objects to recognise
+        lang: Language code (default: chi_sim+eng for Chinese and English)
+        api: Optional tesserocr.PyTessBaseAPI handle to reuse
+        threads: Maximum page-level OCR threads (default: default_page_threads())
+
+    Returns:
+        List of extracted texts, one per page
+    """
+    images = (render_pdf_page(page, PDF_DPI) for page in pages)
+    page_texts = ocr_images(images, lang, api, threads)
+
+    if sum(len(text.strip()) for text in page_texts) < MIN_PDF_TEXT_CHARS:
+        images = (render_pdf_page(page, PDF_FALLBACK_DPI) for page in pages)
+        page_texts = ocr_images(images, lang, api, threads)
+    return page_texts
+
+
+def extract_from_pdf(pdf_path: Path, lang: str = 'chi_sim+eng', api: Optional[Any] = None,
+                     threads: Optional[int] = None) -> str:
     """
     Extract text from a PDF file using Tesseract OCR
     
-    First converts PDF pages to images, then extracts text from each page.
+    Born-digital PDFs whose first pages carry more than MIN_NATIVE_TEXT_CHARS
+    of embedded text are returned as-is without OCR. Otherwise renders the
+    first MAX_PDF_PAGES pages with PyMuPDF at PDF_DPI and OCRs
+    them in-process (no poppler subprocess, no temporary files). If the
+    result is suspiciously short, the pages are re-rendered at
+    PDF_FALLBACK_DPI and OCRed again.
     
     Args:
         pdf_path: Path to the PDF file
         lang: Language code (default: chi_sim+eng for Chinese and English)
+        api: Optional tesserocr.PyTessBaseAPI handle to reuse
+        threads: Maximum page-level OCR threads (default: default_page_threads())
     
     Returns:
         Extracted text from all pages as string
     """
     try:
-        # Import PIL/Pillow here to avoid errors if not installed
-        from PIL import Image
-        
-        # Try to use pdf2image to convert PDF to images
-        try:
-            from pdf2image import convert_from_path
-            images = convert_from_path(str(pdf_path), dpi=300)
-            full_text = []
-            
-            for page_num, image in enumerate(images, 1):
-                # Save image to temp file
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                    image.save(tmp.name, 'PNG')
-                    tmp_path = Path(tmp.name)
-                
-                # Extract text from this page
-                page_text = extract_from_image(tmp_path, lang)
-                if page_text:
-                    full_text.append(f"--- Page {page_num} ---\n{page_text}")
-                
-                # Clean up temp file
-                tmp_path.unlink()
-            
-            return "\n\n".join(full_text)
-            
-        except ImportError:
-            print("pdf2image not installed. PDF processing may not work optimally.", file=sys.stderr)
-            print("Install with: pip install pdf2image", file=sys.stderr)
-            return ""
-            
+        import pymupdf
+    except ImportError:
+        print("PyMuPDF not installed. PDF processing is unavailable.", file=sys.stderr)
+        print("Install with: pip install pymupdf", file=sys.stderr)
+        return ""
+
+    try:
+        with pymupdf.open(str(pdf_path)) as doc:
+            pages = [doc.load_page(i) for i in range(min(MAX_PDF_PAGES, doc.page_count))]
+
+            page_texts = [page.get_text() for page in pages]
+            if sum(len(text.strip()) for text in page_texts) > MIN_NATIVE_TEXT_CHARS:
+                print(f"Using embedded text layer of {pdf_path.name}", file=sys.stderr)
+            elif not tesseract_available(api):
+                return ""
+            else:
+                page_texts = ocr_pages(pages, lang, api, threads)
+
+        full_text = []
+        for page_num, page_text in enumerate(page_texts, 1):
+            if page_text:
+                full_text.append(f"--- Page {page_num} ---\n{page_text}")
+
+        return "\n\n".join(full_text)
+
     except Exception as e:
         print(f"Error processing PDF {pdf_path}: {e}", file=sys.stderr)
         return ""
 
 
-def extract_text(file_path: Path, lang: str = 'chi_sim+eng') -> str:
+def extract_text(file_path: Path, lang: str = 'chi_sim+eng', api: Optional[Any] = None,
+                 threads: Optional[int] = None) -> str:
     """
     Extract text from a file (PDF or image) using Tesseract OCR
     
     Args:
         file_path: Path to the file
         lang: Language code (default: chi_sim+eng for Chinese and English)
+        api: Optional tesserocr.PyTessBaseAPI handle to reuse across files
+        threads: Maximum page-level OCR threads for PDFs
     
     Returns:
         Extracted text as string
@@ -114,18 +323,15 @@ def extract_text(file_path: Path, lang: str = 'chi_sim+eng') -> str:
         print(f"File not found: {file_path}", file=sys.stderr)
         return ""
     
-    # Check Tesseract is installed
-    if not check_tesseract_installed():
-        print("Tesseract OCR is not installed or not in PATH", file=sys.stderr)
-        print("Install it from: https://github.com/tesseract-ocr/tesseract", file=sys.stderr)
-        return ""
-    
     suffix = file_path.suffix.lower()
     
     if suffix == '.pdf':
-        return extract_from_pdf(file_path, lang)
+        # Checks for Tesseract itself, only if the PDF has no usable text layer
+        return extract_from_pdf(file_path, lang, api, threads)
     elif suffix in ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif']:
-        return extract_from_image(file_path, lang)
+        if not tesseract_available(api):
+            return ""
+        return extract_from_image(file_path, lang, api)
     else:
         print(f"Unsupported file type: {suffix}", file=sys.stderr)
         return ""
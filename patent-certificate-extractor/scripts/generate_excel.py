@@ -5,81 +5,193 @@ Excel generation script for patent certificate data
 Creates Excel files from extracted patent certificate information.
 """
 
+import io
+import math
+import operator
+import re
 import sys
+import zipfile
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
 try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    from datetime import datetime
+    import xlsxwriter
 except ImportError:
-    print("openpyxl not installed. Install with: pip install openpyxl", file=sys.stderr)
+    print("xlsxwriter not installed. Install with: pip install xlsxwriter", file=sys.stderr)
     sys.exit(1)
 
-
-def normalize_patent_type(patent_type: str) -> str:
+# Strict YYYY-MM-DD, handled by datetime.fromisoformat without the strptime loop
+_ISO = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Cell styles, defined once; the medium (top=2) border marks the first row of each group
+HEADER_STYLE = {
+    'bold': True, 'font_color': 'white', 'bg_color': '#4472C4',
+    'align': 'center', 'valign': 'vcenter', 'text_wrap': True, 'border': 1
+}
+CELL_STYLE = {'align': 'left', 'valign': 'top', 'text_wrap': True, 'border': 1}
+GROUP_TOP_STYLE = {**CELL_STYLE, 'top': 2}
+
+# Entry fields written as the sheet's columns (also used as the column headers)
+FIELDS = ('专利号', '专利名称', '权利人', '专利类型', '发明人', '申请日期')
+_get_row = operator.itemgetter(*FIELDS)
+
+# Above this many rows create_excel writes the sheet XML directly (see _write_xlsx_fast)
+THRESHOLD = 5000
+
+SHEET_NAME = "专利证书信息"
+
+# Control characters OCR text may contain that are not allowed in XML
+_XML_ILLEGAL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Static parts of a minimal .xlsx package for _write_xlsx_fast. Cell style
+# indexes mirror HEADER_STYLE (1), CELL_STYLE (2) and GROUP_TOP_STYLE (3).
+_BORDER = '<border><left style="thin"/><right style="thin"/><top style="{}"/><bottom style="thin"/><diagonal/></border>'
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{SHEET_NAME}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2">'
+        '<font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+        '</fonts>'
+        '<fills count="3">'
+        '<fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill>'
+        '<fill><patternFill patternType="solid"><fgColor rgb="FF4472C4"/><bgColor indexed="64"/></patternFill></fill>'
+        '</fills>'
+        '<borders count="3">'
+        '<border><left/><right/><top/><bottom/><diagonal/></border>'
+        + _BORDER.format('thin') + _BORDER.format('medium') +
+        '</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" '
+        'applyBorder="1" applyAlignment="1"><alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="left" vertical="top" wrapText="1"/></xf>'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="2" xfId="0" applyBorder="1" applyAlignment="1">'
+        '<alignment horizontal="left" vertical="top" wrapText="1"/></xf>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+# Patent type keywords -> (normalized Chinese name, sort priority), checked in order
+_TYPE_TABLE = (
+    (('发明', 'invention', 'invent'), ('发明专利', 1)),
+    (('实用新型', '实用', 'utility'), ('实用新型专利', 2)),
+    (('外观', 'design'), ('外观设计专利', 3)),
+)
+
+
+@lru_cache(maxsize=256)
+def classify_patent_type(patent_type: str) -> Tuple[str, int]:
     """
-    Normalize patent type name to Chinese for consistent sorting
+    Normalize a patent type and get its sort priority in one pass
+
+    Priority order:
+    1. 发明专利 (highest priority)
+    2. 实用新型专利
+    3. 外观设计专利 (lowest priority)
 
     Args:
         patent_type: Original patent type name (may be in Chinese or English)
 
     Returns:
-        Normalized patent type name in Chinese
+        (normalized Chinese name, priority); unrecognized types keep their
+        original name with priority 4
     """
     if not patent_type:
-        return ''
+        return '', 4
+
+    # casefold, not lower: one pass that also handles non-ASCII case rules in mixed text
+    type_folded = patent_type.casefold()
+    for keywords, result in _TYPE_TABLE:
+        if any(keyword in type_folded for keyword in keywords):
+            return result
 
-    type_lower = patent_type.lower()
+    # Return original if not recognized
+    return patent_type, 4
 
-    # Invention patents
-    if any(keyword in type_lower for keyword in ['invention', 'invent', '发明']):
-        return '发明专利'
 
-    # Utility model patents
-    if any(keyword in type_lower for keyword in ['utility', '实用', '实用新型']):
-        return '实用新型专利'
+def normalize_patent_type(patent_type: str) -> str:
+    """
+    Normalize patent type name to Chinese for consistent sorting
 
-    # Design patents
-    if any(keyword in type_lower for keyword in ['design', '外观']):
-        return '外观设计专利'
+    Args:
+        patent_type: Original patent type name (may be in Chinese or English)
 
-    # Return original if not recognized
-    return patent_type
+    Returns:
+        Normalized patent type name in Chinese
+    """
+    return classify_patent_type(patent_type)[0]
 
 
 def get_patent_type_priority(patent_type: str) -> int:
     """
-    Get priority for patent type sorting
-
-    Priority order:
-    1. 发明专利 (highest priority)
-    2. 实用新型专利
-    3. 外观设计专利 (lowest priority)
+    Get priority for patent type sorting (lower = higher priority)
 
     Args:
-        patent_type: Normalized patent type name
+        patent_type: Patent type name, normalized or original
 
     Returns:
-        Priority number (lower = higher priority)
+        Priority number (1=Invention, 2=Utility, 3=Design, 4=Unknown)
     """
-    type_lower = (patent_type or '').lower()
-
-    if '发明' in type_lower or 'invention' in type_lower:
-        return 1
-    elif '实用' in type_lower or 'utility' in type_lower:
-        return 2
-    elif '外观' in type_lower or 'design' in type_lower:
-        return 3
-    else:
-        return 4  # Unknown types
+    return classify_patent_type(patent_type)[1]
 
 
+@lru_cache(maxsize=4096)
 def parse_application_date(date_str: str) -> datetime:
     """
     Parse application date string to datetime object
 
+    Results are memoized by the raw string: a batch of certificates often
+    shares filing dates, and strptime is the expensive part of sorting.
+
     Supports multiple date formats:
     - YYYY-MM-DD
     - YYYY/MM/DD
@@ -96,6 +208,20 @@ def parse_application_date(date_str: str) -> datetime:
     if not date_str:
         return datetime.min
 
+    date_str = date_str.strip()
+
+    # Fast paths for the common YYYY-MM-DD and YYYY/MM/DD forms
+    if len(date_str) == 10:
+        if date_str[4] == '/':
+            iso_candidate = date_str.replace('/', '-')
+        else:
+            iso_candidate = date_str
+        if _ISO.match(iso_candidate):
+            try:
+                return datetime.fromisoformat(iso_candidate)
+            except ValueError:
+                pass
+
     date_formats = [
         '%Y-%m-%d',
         '%Y/%m/%d',
@@ -107,7 +233,7 @@ def parse_application_date(date_str: str) -> datetime:
 
     for fmt in date_formats:
         try:
-            return datetime.strptime(date_str.strip(), fmt)
+            return datetime.strptime(date_str, fmt)
         except (ValueError, TypeError):
             continue
 
@@ -115,131 +241,225 @@ def parse_application_date(date_str: str) -> datetime:
     return datetime.min
 
 
-def sort_patent_data(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _sort_keyed(data: List[Dict[str, Any]],
+                dedup: bool = True) -> List[Tuple[Tuple[Any, int, int], Dict[str, Any]]]:
     """
-    Sort patent data by:
-    1. Patent holder (alphabetical order)
-    2. Patent type priority (Invention > Utility Model > Design)
-    3. Application date (descending, most recent first)
+    Sort patent data, keeping each entry's computed sort key
+
+    The keys are returned rather than stored on the entries so that callers
+    (e.g. create_excel's grouping) can reuse the normalized priority without
+    the entry dicts gaining extra, non-JSON-serializable fields.
 
     Args:
         data: List of patent dictionaries
+        dedup: Drop entries repeating an earlier 专利号 (see sort_patent_data)
 
     Returns:
-        Sorted list of patent dictionaries
+        Sorted list of ((holder, type_priority, -date_ordinal), entry) pairs
     """
-    def sort_key(entry):
+    if dedup:
+        # Entries without a patent number are all kept (keyed by identity)
+        unique = list({entry.get('专利号', '') or id(entry): entry for entry in data}.values())
+        if len(unique) < len(data):
+            print(f"Dropped {len(data) - len(unique)} duplicate entries (same 专利号, last one kept)", file=sys.stderr)
+        data = unique
+
+    # Decorate-sort-undecorate: each key tuple is built once, then sorted on directly
+    keyed = []
+    for entry in data:
         holder = entry.get('权利人', '')
         patent_type = entry.get('专利类型', '')
         app_date = entry.get('申请日期', '')
 
-        # Normalize patent type for sorting
-        normalized_type = normalize_patent_type(patent_type)
-
-        # Parse date for sorting
+        # Parse date for sorting (memoized per distinct string)
         date_obj = parse_application_date(app_date)
 
-        # Sort key: (holder, type_priority, -date_timestamp)
-        return (
+        # Sort key: (holder, type_priority, -date_ordinal); dates are day-resolution,
+        # and the ordinal avoids timestamp()'s timezone conversion
+        keyed.append(((
             holder,  # Alphabetical order
-            get_patent_type_priority(normalized_type),  # Type priority (1=Invention, 2=Utility, 3=Design)
-            -date_obj.timestamp() if date_obj != datetime.min else 0  # Negative for descending order
-        )
+            classify_patent_type(patent_type)[1],  # Type priority (1=Invention, 2=Utility, 3=Design)
+            -date_obj.toordinal() if date_obj != datetime.min else 0  # Negative for descending order; unparsed dates last
+        ), entry))
 
-    return sorted(data, key=sort_key)
+    keyed.sort(key=operator.itemgetter(0))
+    return keyed
 
 
-def create_excel(data: List[Dict[str, Any]], output_path: Path) -> bool:
+def sort_patent_data(data: List[Dict[str, Any]], dedup: bool = True) -> List[Dict[str, Any]]:
+    """
+    Sort patent data by:
+    1. Patent holder (alphabetical order)
+    2. Patent type priority (Invention > Utility Model > Design)
+    3. Application date (descending, most recent first)
+
+    With dedup, entries sharing a 专利号 (e.g. the same certificate OCRed in
+    several runs) are collapsed before sorting: the last occurrence wins.
+    Entries with an empty 专利号 are never treated as duplicates.
+
+    Args:
+        data: List of patent dictionaries
+        dedup: Remove duplicate patent numbers before sorting (default: True)
+
+    Returns:
+        Sorted list of patent dictionaries (the original dict objects, not copies)
+    """
+    return [entry for _, entry in _sort_keyed(data, dedup)]
+
+
+def _cell_value(value: Any) -> Any:
+    """
+    Normalize an entry value to a scalar both Excel writers handle the same way
+
+    Lists (e.g. several inventors) are joined with ';' like the single-string
+    form, finite numbers are kept, and anything else (including booleans and
+    NaN/inf, which have no cell representation) becomes text.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value if math.isfinite(value) else str(value)
+    if isinstance(value, (list, tuple)):
+        return ';'.join(str(item) for item in value if item is not None)
+    return str(value)
+
+
+def _iter_rows(sorted_keyed: List[Tuple[Tuple[Any, int, int], Dict[str, Any]]]) -> Iterator[Tuple[tuple, bool]]:
+    """
+    Yield (values, starts_new_group) for each sorted entry
+
+    Values are normalized with _cell_value, so the xlsxwriter and fast_write
+    paths receive identical scalars. A group is a run of rows with the same holder and patent type priority.
+    """
+    # Track previous (holder, type priority) for grouping
+    previous_group = None
+    for (holder, priority, _), entry in sorted_keyed:
+        current_group = (holder, priority)
+        # One C-level lookup of all fields; entries missing a field take the slow path
+        try:
+            values = _get_row(entry)
+        except KeyError:
+            values = tuple(entry.get(field, '') for field in FIELDS)
+        yield tuple(_cell_value(value) for value in values), current_group != previous_group
+        previous_group = current_group
+
+
+def _xml_cell(ref: str, value: Any, style: int) -> str:
+    """One <c> element: numbers as values, everything else as an inline string"""
+    if value is None or value == '':
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = escape(_XML_ILLEGAL.sub('', str(value)))
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _write_xlsx_fast(sorted_keyed: List[Tuple[Tuple[Any, int, int], Dict[str, Any]]], output_path: Path):
+    """
+    Write the report as a bare .xlsx package: static workbook parts plus a
+    worksheet XML streamed row by row into the ZIP
+
+    Produces the same sheet as the xlsxwriter path (header and group-border
+    styles, column widths) without building any per-cell objects, for
+    patent lists too large for that to be cheap.
+
+    Args:
+        sorted_keyed: Output of _sort_keyed
+        output_path: Path for the output Excel file
+    """
+    # <cols> precedes <sheetData>, so widths need a pass before the rows are streamed;
+    # rows are regenerated for the second pass rather than held in memory
+    column_widths = [len(header) for header in FIELDS]
+    for values, _ in _iter_rows(sorted_keyed):
+        for col_index, value in enumerate(values):
+            column_widths[col_index] = max(column_widths[col_index], len(str(value or '')))
+
+    columns = [chr(ord('A') + i) for i in range(len(FIELDS))]
+
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            zf.writestr(name, content)
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as raw:
+            out = io.TextIOWrapper(raw, encoding='utf-8')
+            out.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<dimension ref="A1:{columns[-1]}{len(sorted_keyed) + 1}"/><cols>'
+            )
+            for col_num, max_length in enumerate(column_widths, 1):
+                out.write(f'<col min="{col_num}" max="{col_num}" width="{min(max_length + 2, 50)}" customWidth="1"/>')
+            out.write('</cols><sheetData><row r="1">')
+            out.write(''.join(_xml_cell(f'{col}1', header, 1) for col, header in zip(columns, FIELDS)))
+            out.write('</row>')
+            for row_num, (values, new_group) in enumerate(_iter_rows(sorted_keyed), 2):
+                style = 3 if new_group else 2
+                out.write(f'<row r="{row_num}">')
+                out.write(''.join(_xml_cell(f'{col}{row_num}', value, style) for col, value in zip(columns, values)))
+                out.write('</row>')
+            out.write('</sheetData></worksheet>')
+            out.flush()
+            out.detach()
+
+
+def create_excel(data: List[Dict[str, Any]], output_path: Path, fast_write: Optional[bool] = None,
+                 dedup: bool = True) -> bool:
     """
     Create an Excel file with patent certificate data
     
     Args:
         data: List of dictionaries containing patent information
         output_path: Path for the output Excel file
+        fast_write: Write the sheet XML directly instead of through xlsxwriter
+            (default: only for more than THRESHOLD rows)
+        dedup: Keep only the last entry per 专利号 (see sort_patent_data)
     
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Sort data before creating Excel
-        sorted_data = sort_patent_data(data)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "专利证书信息"
-
-        # Define column headers
-        headers = ['专利号', '专利名称', '权利人', '专利类型', '发明人', '申请日期']
-
-        # Write headers with styling
-        header_font = Font(bold=True, color='FFFFFF')
-        header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-        header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-
-        # Define border styles for grouping
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-
-        thick_top_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='medium'),
-            bottom=Side(style='thin')
-        )
-
-        # Track previous holder for grouping
-        previous_holder = None
+        # Sort data before creating Excel; the sort keys are reused for grouping
+        sorted_keyed = _sort_keyed(data, dedup)
+
+        if fast_write is None:
+            fast_write = len(sorted_keyed) > THRESHOLD
+        if fast_write:
+            _write_xlsx_fast(sorted_keyed, output_path)
+            return True
+
+        # constant_memory flushes each row to disk as soon as the next one starts; strings stay
+        # plain text (no formulas or hyperlinks), as in the fast_write path
+        wb = xlsxwriter.Workbook(str(output_path), {
+            'constant_memory': True, 'strings_to_numbers': False,
+            'strings_to_formulas': False, 'strings_to_urls': False,
+        })
+        ws = wb.add_worksheet(SHEET_NAME)
+
+        headers = FIELDS
+
+        # Formats are created once per workbook and shared by every row
+        header_fmt = wb.add_format(HEADER_STYLE)
+        row_fmt = wb.add_format(CELL_STYLE)
+        row_top_fmt = wb.add_format(GROUP_TOP_STYLE)
+
+        ws.write_row(0, 0, headers, header_fmt)
+
+        # Column widths are tracked while writing, so rows are visited only once
+        column_widths = [len(header) for header in headers]
 
         # Write data rows
-        for row_num, entry in enumerate(sorted_data, 2):
-            current_holder = entry.get('权利人', '')
+        for row_num, (values, new_group) in enumerate(_iter_rows(sorted_keyed), 1):
+            # Thick top border starts each new holder or patent type group
+            ws.write_row(row_num, 0, values, row_top_fmt if new_group else row_fmt)
 
-            # Use thick top border for new holder groups
-            border_style = thick_top_border if current_holder != previous_holder else thin_border
+            for col_index, value in enumerate(values):
+                column_widths[col_index] = max(column_widths[col_index], len(str(value or '')))
 
-            ws.cell(row=row_num, column=1, value=entry.get('专利号', '')).border = border_style
-            ws.cell(row=row_num, column=2, value=entry.get('专利名称', '')).border = border_style
-            ws.cell(row=row_num, column=3, value=entry.get('权利人', '')).border = border_style
-            ws.cell(row=row_num, column=4, value=entry.get('专利类型', '')).border = border_style
-            ws.cell(row=row_num, column=5, value=entry.get('发明人', '')).border = border_style
-            ws.cell(row=row_num, column=6, value=entry.get('申请日期', '')).border = border_style
+        # Auto-adjust column widths (with some padding)
+        for col_index, max_length in enumerate(column_widths):
+            ws.set_column(col_index, col_index, min(max_length + 2, 50))
 
-            previous_holder = current_holder
-        
-        # Auto-adjust column widths
-        for col_num in range(1, len(headers) + 1):
-            column_letter = get_column_letter(col_num)
-            max_length = 0
-
-            # Check header length
-            max_length = max(max_length, len(headers[col_num - 1]))
-
-            # Check data length
-            for row_num in range(2, len(sorted_data) + 2):
-                cell_value = str(ws.cell(row=row_num, column=col_num).value or '')
-                max_length = max(max_length, len(cell_value))
-
-            # Set column width (with some padding)
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Apply alignment to all cells
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-        
-        # Save the workbook
-        wb.save(output_path)
+        wb.close()
         return True
         
     except Exception as e:
@@ -272,14 +492,20 @@ def open_excel(file_path: Path):
 def main():
     """Command-line interface for the Excel generation script"""
     if len(sys.argv) < 2:
-        print("Usage: python generate_excel.py <output_path>")
+        print("Usage: python generate_excel.py <output_path> [data.json | JSON string]")
         print("Example: python generate_excel.py patent_data.xlsx")
+        print("Example: python generate_excel.py patent_data.xlsx sorted_data.json")
         sys.exit(1)
     
-    # For testing with JSON input
+    # For testing with JSON input: a .json file path (no argv size limit) or inline JSON
     if len(sys.argv) == 3:
         import json
-        data = json.loads(sys.argv[2])
+        source = sys.argv[2]
+        if source.endswith('.json') and Path(source).is_file():
+            with open(source, encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = json.loads(source)
     else:
         # Example data for testing
         data = []
@@ -4,20 +4,15 @@ Test script demonstrating the full workflow of patent certificate extraction
 """
 
 import sys
-import json
 from pathlib import Path
 from typing import List, Dict, Any
-import subprocess
 
+# Add scripts directory to path and call the other scripts in-process
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir))
 
-def extract_text(file_path: Path, ocr_script: Path) -> str:
-    """Extract OCR text from a file"""
-    result = subprocess.run(
-        ['python3', str(ocr_script), str(file_path)],
-        capture_output=True,
-        text=True
-    )
-    return result.stdout
+from extract_ocr import extract_text
+from generate_excel import create_excel
 
 
 def extract_with_llm(extracted_texts: List[Dict[str, str]]) -> List[Dict[str, Any]]:
@@ -73,10 +68,6 @@ def main():
         "/Users/licheng/Desktop/AGENT/7-公司的主要财产/7.1 知识产权-专利/2020202177990-一种新型冠状病毒抗原检测试剂盒-实用新型专利证书(专利证书).pdf"
     ]
 
-    script_dir = Path(__file__).parent
-    ocr_script = script_dir / 'extract_ocr.py'
-    excel_script = script_dir / 'generate_excel.py'
-
     # Step 1: Extract OCR text
     print("\n[Step 1] Extracting OCR text from patent certificates...")
     extracted_texts = []
@@ -85,7 +76,7 @@ def main():
         file_path = Path(file_path)
         if file_path.exists():
             print(f"  Processing: {file_path.name}")
-            text = extract_text(file_path, ocr_script)
+            text = extract_text(file_path)
 
             if text:
                 extracted_texts.append({
@@ -169,21 +160,10 @@ def main():
 
     excel_output = output_dir / '专利清单.xlsx'
 
-    # Convert sample_data to JSON string for the script
-    json_data = json.dumps(sample_data, ensure_ascii=False)
-
-    result = subprocess.run(
-        ['python3', str(excel_script), str(excel_output), json_data],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode == 0:
+    if create_excel(sample_data, excel_output):
         print(f"  ✓ Excel file created: {excel_output}")
-        print(f"    {result.stdout}")
     else:
         print(f"  ✗ Failed to create Excel file")
-        print(f"    Error: {result.stderr}")
 
     # Summary
     print("\n" + "=" * 80)
@@ -192,7 +172,7 @@ def main():
     print(f"  - OCR text files: {len(extracted_texts)} files")
     print(f"  - Excel file: {excel_output.name}")
     print("\nNext steps for production use:")
-    print("  1. Install required dependencies: pip install openpyxl pdf2image Pillow anthropic")
+    print("  1. Install required dependencies: pip install xlsxwriter pymupdf Pillow anthropic")
     print("  2. Set up LLM API credentials (e.g., Claude API key)")
     print("  3. Modify the extract_with_llm function to call the LLM API")
     print("  4. Process all files in the patent folder using batch_extract.py")
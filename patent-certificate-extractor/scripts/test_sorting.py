@@ -5,22 +5,20 @@ Test script to verify sorting and grouping functionality
 
 import sys
 import json
+import tempfile
 from pathlib import Path
 
 # Add scripts directory to path
 script_dir = Path(__file__).parent
 sys.path.insert(0, str(script_dir))
 
-# Import functions by reading and executing the generate_excel file
-import importlib.util
-spec = importlib.util.spec_from_file_location("generate_excel", script_dir / "generate_excel.py")
-generate_excel_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(generate_excel_module)
-
-sort_patent_data = generate_excel_module.sort_patent_data
-normalize_patent_type = generate_excel_module.normalize_patent_type
-get_patent_type_priority = generate_excel_module.get_patent_type_priority
-parse_application_date = generate_excel_module.parse_application_date
+from generate_excel import (
+    create_excel,
+    sort_patent_data,
+    normalize_patent_type,
+    get_patent_type_priority,
+    parse_application_date,
+)
 
 
 def test_sorting():
@@ -148,16 +146,77 @@ def test_sorting():
     return sorted_data
 
 
+def test_dedup():
+    """Repeated patent numbers collapse to the last occurrence; empty numbers are never merged"""
+    test_data = [
+        {'专利号': 'ZL201910297462.7', '权利人': '深圳普瑞金生物药业有限公司', '专利类型': '发明专利',
+         '申请日期': '2019-04-12', '专利名称': 'first OCR run'},
+        {'专利号': '', '权利人': '深圳普瑞金生物药业有限公司', '专利类型': '发明专利', '申请日期': '2019-04-10'},
+        {'专利号': 'ZL201910297462.7', '权利人': '深圳普瑞金生物药业有限公司', '专利类型': '发明专利',
+         '申请日期': '2019-04-12', '专利名称': 'second OCR run'},
+        {'权利人': '深圳普瑞金生物药业有限公司', '专利类型': '发明专利', '申请日期': '2019-04-11'},
+    ]
+
+    deduped = sort_patent_data(test_data)
+    assert len(deduped) == 3
+    assert [e['专利名称'] for e in deduped if e.get('专利号')] == ['second OCR run']
+    assert sum(1 for e in deduped if not e.get('专利号')) == 2
+
+    assert len(sort_patent_data(test_data, dedup=False)) == 4
+
+
+def test_fast_write_matches_xlsxwriter():
+    """The direct ZIP/XML writer must produce the same sheet as the xlsxwriter path"""
+    from openpyxl import load_workbook
+
+    data = json.loads((script_dir.parent / 'test_sorted_data.json').read_text(encoding='utf-8'))
+    # Non-string values must be normalized identically by both writers
+    data[0] = dict(data[0], 发明人=['ZHANG, Jishuai', 'SU, Hongchang'])
+    # Formula- and URL-like text stays plain text; NaN/inf (accepted by json.loads) become text
+    data[1] = dict(data[1], 专利名称='=SUM(A1:A2)', 发明人=float('nan'))
+    data[2] = dict(data[2], 专利名称='http://example.com/patent', 发明人=float('inf'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sheets = {}
+        for fast_write in (True, False):
+            path = Path(tmp) / f"fast_{fast_write}.xlsx"
+            assert create_excel(data, path, fast_write=fast_write)
+            sheets[fast_write] = load_workbook(path).active
+
+        fast, regular = sheets[True], sheets[False]
+        assert fast.title == regular.title
+        assert list(fast.values) == list(regular.values)
+        assert fast['E2'].value == 'ZHANG, Jishuai;SU, Hongchang'
+        cells = {cell.value: cell for row in regular.iter_rows(min_row=2) for cell in row}
+        assert {'=SUM(A1:A2)', 'http://example.com/patent', 'nan', 'inf'} <= cells.keys()
+        assert cells['=SUM(A1:A2)'].data_type == 's'
+        assert cells['http://example.com/patent'].hyperlink is None
+
+        for ws in (fast, regular):
+            header = ws['A1']
+            assert header.font.b
+            assert header.fill.fill_type == 'solid' and header.fill.fgColor.rgb.endswith('4472C4')
+
+            previous_group = None
+            for row in ws.iter_rows(min_row=2):
+                group = (row[2].value, get_patent_type_priority(row[3].value))
+                expected = 'medium' if group != previous_group else 'thin'
+                assert row[0].border.top.style == expected, (row[0].coordinate, row[0].border.top.style)
+                previous_group = group
+
+
 def main():
     """Run the test"""
-    sorted_data = test_sorting()
+    test_sorting()
+    test_dedup()
+    test_fast_write_matches_xlsxwriter()
 
     print("\n" + "=" * 80)
     print("Test Complete!")
     print("\nNext steps:")
     print("  1. Review the sorted output above")
     print("  2. Generate Excel file with sorted data:")
-    print(f"     python generate_excel.py /tmp/test_sorted_patents.xlsx '{json.dumps(sorted_data)}'")
+    print(f"     python generate_excel.py /tmp/test_sorted_patents.xlsx {script_dir.parent / 'test_sorted_data.json'}")
 
 
 if __name__ == "__main__":